@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.keyframe_extractor import KeyframeExtractor
+
+VIDEO_EXTENSIONS = [".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm"]
+
+# Bulk ingest of a video directory without going through /api/upload.
+# Files are hashed and deduplicated first, then keyframe extraction runs in a
+# process pool, embeddings are generated in batches in this process, and cluster
+# and Supabase writes go out in bulk. Every stored file is appended to the
+# checkpoint, so a rerun skips it.
+
+_extractor: Optional[KeyframeExtractor] = None
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def shot_id_for(content_hash: str, frame_index: int) -> str:
+    # Stable across runs, so a replayed batch overwrites its own rows.
+    return f"{content_hash[:16]}_{frame_index}"
+
+def _init_worker():
+    global _extractor
+    _extractor = KeyframeExtractor()
+
+def _hash_file(path: str) -> Dict:
+    try:
+        return {"path": path, "hash": file_hash(path)}
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+def _decode_file(path: str, content_hash: str) -> Dict:
+    try:
+        # The hash suffix keeps same-named files from different folders apart.
+        base_filename = os.path.splitext(os.path.basename(path))[0]
+        keyframes = _extractor.extract_keyframes(path, name=f"{base_filename}_{content_hash[:8]}")
+
+        return {"path": path, "hash": content_hash, "keyframes": keyframes}
+
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+def discover_files(directory: str, extensions: List[str]) -> List[str]:
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in extensions:
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+def load_checkpoint(checkpoint_path: str) -> Set[str]:
+    if not os.path.exists(checkpoint_path):
+        return set()
+
+    hashes = set()
+    with open(checkpoint_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                hashes.add(json.loads(line)["hash"])
+            except (ValueError, KeyError):
+                # A crash mid-write can leave a truncated last line.
+                continue
+    return hashes
+
+class BulkIngester:
+    def __init__(
+        self,
+        checkpoint_path: str,
+        batch_size: int = 64,
+        embedding_batch_size: int = 32
+    ):
+        # Imported here so the spawned decode workers never load the ML models.
+        from services.embedding_engine import EmbeddingEngine
+        from services.clustering_service import ClusteringClient
+        from services.storage_service import StorageService
+
+        # An in-process ClusteringEngine would keep noise shots in memory that vanish
+        # when the CLI exits, and would open a second Chroma client next to the API.
+        clustering_service_address = os.getenv("CLUSTERING_SERVICE_ADDRESS")
+        if not clustering_service_address:
+            print("Error: CLUSTERING_SERVICE_ADDRESS must point at the running clustering service")
+            sys.exit(1)
+
+        self.clustering_engine = ClusteringClient(clustering_service_address)
+        self.embedding_engine = EmbeddingEngine()
+        self.storage_service = StorageService()
+
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.embedding_batch_size = embedding_batch_size
+
+        self.pending: List[Dict] = []
+        self.pending_keyframes = 0
+
+        self.files_done = 0
+        self.files_skipped = 0
+        self.files_failed = 0
+        self.shots_done = 0
+
+    def add(self, decoded: Dict):
+        self.pending.append(decoded)
+        self.pending_keyframes += len(decoded["keyframes"])
+
+        if self.pending_keyframes >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        entries = [
+            (decoded, keyframe_data)
+            for decoded in self.pending
+            for keyframe_data in decoded["keyframes"]
+        ]
+        keyframe_paths = [keyframe_data["path"] for _, keyframe_data in entries]
+
+        scene_vectors = self.embedding_engine.generate_scene_embeddings(
+            keyframe_paths,
+            batch_size=self.embedding_batch_size
+        )
+        character_vectors = self.embedding_engine.generate_character_embeddings_batch(
+            keyframe_paths,
+            batch_size=self.embedding_batch_size
+        )
+
+        cluster_results = self.clustering_engine.assign_to_clusters([
+            {
+                "shot_id": shot_id_for(decoded["hash"], keyframe_data["frame_index"]),
+                "scene_vector": scene_vectors[idx],
+                "character_vectors": character_vectors[idx],
+                "keyframe_path": keyframe_data["path"],
+                "thumbnails": keyframe_data.get("thumbnails")
+            }
+            for idx, (decoded, keyframe_data) in enumerate(entries)
+        ])
+
+        shot_data = []
+        for (decoded, keyframe_data), cluster_result in zip(entries, cluster_results):
+            shot_data.append({
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, cluster_result["shot_id"])),
+                "shot_id": cluster_result["shot_id"],
+                "keyframe_path": keyframe_data["path"],
+                "frame_index": keyframe_data["frame_index"],
+                "cluster_type": cluster_result["cluster_type"],
+                "cluster_id": cluster_result["cluster_id"],
+                "similarity_score": cluster_result["similarity_score"],
+                "timestamp": datetime.now().isoformat()
+            })
+
+        result = asyncio.run(self.storage_service.save_shots(shot_data))
+        if self.storage_service.supabase and not result["success"]:
+            raise RuntimeError(f"Saving shots to Supabase failed: {result.get('error')}")
+
+        # Checkpoint only once the batch is stored. A crash before this point replays
+        # the batch, and the stable shot ids turn the replay into upserts.
+        with open(self.checkpoint_path, "a") as f:
+            for decoded in self.pending:
+                f.write(json.dumps({
+                    "hash": decoded["hash"],
+                    "path": decoded["path"],
+                    "shots": len(decoded["keyframes"]),
+                    "timestamp": datetime.now().isoformat()
+                }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.files_done += len(self.pending)
+        self.shots_done += len(entries)
+
+        self.pending = []
+        self.pending_keyframes = 0
+
+def report(ingester: BulkIngester, total: int, started: float):
+    elapsed = time.time() - started
+    rate = ingester.files_done / elapsed * 3600 if elapsed else 0.0
+    processed = ingester.files_done + ingester.files_skipped + ingester.files_failed
+
+    print(
+        f"[{processed}/{total}] {ingester.files_done} ingested, "
+        f"{ingester.files_skipped} skipped, {ingester.files_failed} failed, "
+        f"{ingester.shots_done} shots, {rate:.0f} files/hour"
+    )
+
+def ingest(
+    directory: str,
+    checkpoint_path: str,
+    workers: int,
+    batch_size: int,
+    embedding_batch_size: int,
+    extensions: List[str]
+):
+    files = discover_files(directory, extensions)
+    done_hashes = load_checkpoint(checkpoint_path)
+
+    print(f"Found {len(files)} video files in {directory}")
+    print(f"Checkpoint has {len(done_hashes)} files already ingested")
+
+    os.makedirs("keyframes", exist_ok=True)
+
+    ingester = BulkIngester(
+        checkpoint_path=checkpoint_path,
+        batch_size=batch_size,
+        embedding_batch_size=embedding_batch_size
+    )
+
+    started = time.time()
+
+    # Spawn rather than fork: the parent holds the CLIP and MTCNN models.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        # Hash everything first, so each distinct file is decoded exactly once and
+        # duplicates never write keyframes of their own.
+        unique_files: Dict[str, str] = {}
+        for hashed in pool.map(_hash_file, files, chunksize=8):
+            if "error" in hashed:
+                ingester.files_failed += 1
+                print(f"✗ {hashed['path']}: {hashed['error']}")
+            elif hashed["hash"] in done_hashes or hashed["hash"] in unique_files:
+                ingester.files_skipped += 1
+            else:
+                unique_files[hashed["hash"]] = hashed["path"]
+
+        print(f"{len(unique_files)} new files to ingest")
+
+        # Only a couple of files per worker are queued at a time, so a failing
+        # flush stops the run instead of decoding the rest of the catalogue.
+        queue = iter(unique_files.items())
+        in_flight = set()
+        count = 0
+
+        try:
+            while True:
+                for content_hash, path in itertools.islice(queue, workers * 2 - len(in_flight)):
+                    in_flight.add(pool.submit(_decode_file, path, content_hash))
+
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    decoded = future.result()
+                    count += 1
+
+                    if "error" in decoded:
+                        ingester.files_failed += 1
+                        print(f"✗ {decoded['path']}: {decoded['error']}")
+                    elif not decoded["keyframes"]:
+                        ingester.files_failed += 1
+                        print(f"✗ {decoded['path']}: No keyframes extracted")
+                    else:
+                        ingester.add(decoded)
+
+                    if count % 50 == 0:
+                        report(ingester, len(files), started)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    ingester.flush()
+
+    print("\n" + "="*50)
+    report(ingester, len(files), started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest a directory of videos")
+    parser.add_argument("directory")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=64, help="Keyframes per embedding/cluster batch")
+    parser.add_argument("--embedding-batch-size", type=int, default=32)
+    parser.add_argument("--extensions", nargs="+", default=VIDEO_EXTENSIONS)
+    args = parser.parse_args()
+
+    ingest(
+        directory=args.directory,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        embedding_batch_size=args.embedding_batch_size,
+        extensions=[ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in args.extensions]
+    )
+
+if __name__ == "__main__":
+    main()
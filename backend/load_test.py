@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Starts the API with each requested worker count (all sharing one clustering
+# service), checks that a shot uploaded through one worker is visible through
+# every other worker, and measures request throughput against the read endpoints.
+
+def wait_for_server(base_url: str, timeout: float = 600.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/", timeout=2):
+                return True
+        except Exception:
+            time.sleep(1)
+    return False
+
+def fetch(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return response.status == 200
+    except Exception:
+        return False
+
+def fetch_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+def make_test_video(path: str):
+    import cv2
+    import numpy as np
+
+    # Random noise per run, so the upload cannot match an existing cluster by accident.
+    frame = np.random.randint(0, 255, (240, 320, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (320, 240))
+    for _ in range(10):
+        writer.write(frame)
+    writer.release()
+
+def upload(base_url: str, path: str) -> dict:
+    boundary = uuid.uuid4().hex
+    filename = os.path.basename(path)
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+
+    request = urllib.request.Request(
+        f"{base_url}/api/upload",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+def shot_locations(base_url: str) -> dict:
+    locations = {}
+
+    for cluster in fetch_json(f"{base_url}/api/clusters?view_type=scene")["clusters"].values():
+        for shot in cluster["shots"]:
+            locations[shot["keyframe_path"]] = cluster["cluster_id"]
+
+    for shot in fetch_json(f"{base_url}/api/noise_bucket")["noise_shots"]:
+        locations[shot["keyframe_path"]] = "noise_bucket"
+
+    return locations
+
+def check_consistency(base_url: str, uploads: int, reads: int, concurrency: int) -> bool:
+    expected = {}
+
+    # Several unrelated uploads, so that some shots usually land in the noise bucket:
+    # scene clusters live in Chroma on disk, but the noise bucket only lives in the
+    # process that owns the ClusteringEngine, which is where per-worker state diverges.
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(uploads):
+            video_path = os.path.join(directory, f"consistency_{uuid.uuid4().hex[:8]}.mp4")
+            make_test_video(video_path)
+            result = upload(base_url, video_path)
+            expected.update({shot["keyframe_path"]: shot["cluster_id"] for shot in result["shots"]})
+
+    noise = sum(cluster_id == "noise_bucket" for cluster_id in expected.values())
+
+    # Every read is a fresh connection, so they are spread over all workers.
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        views = list(pool.map(lambda _: shot_locations(base_url), range(reads)))
+
+    consistent = sum(
+        all(view.get(path) == cluster_id for path, cluster_id in expected.items())
+        for view in views
+    )
+
+    if consistent == reads:
+        print(
+            f"✓ {len(expected)} uploaded shot(s) ({noise} in the noise bucket) "
+            f"seen with the same assignment in {reads}/{reads} reads"
+        )
+        return True
+
+    print(
+        f"✗ {len(expected)} uploaded shot(s) ({noise} in the noise bucket) "
+        f"missing or reassigned in {reads - consistent}/{reads} reads"
+    )
+    return False
+
+def run_load(base_url: str, endpoints, total_requests: int, concurrency: int):
+    urls = [f"{base_url}{endpoints[i % len(endpoints)]}" for i in range(total_requests)]
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, urls))
+    elapsed = time.time() - start
+
+    return sum(results), len(results) - sum(results), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput across uvicorn worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--settle", type=float, default=15.0, help="Seconds to let every worker finish starting")
+    parser.add_argument("--consistency-uploads", type=int, default=3)
+    parser.add_argument("--consistency-reads", type=int, default=40)
+    parser.add_argument("--service-address", default="127.0.0.1:8001")
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        default=["/api/clusters?view_type=scene", "/api/clusters?view_type=character", "/api/noise_bucket"]
+    )
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        CLUSTERING_SERVICE_ADDRESS=args.service_address,
+        CLUSTERING_SERVICE_AUTHKEY=os.getenv("CLUSTERING_SERVICE_AUTHKEY") or secrets.token_hex(32)
+    )
+
+    print(f"Starting clustering service on {args.service_address}...")
+    service = subprocess.Popen([sys.executable, "-m", "services.clustering_service"], env=env)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    all_consistent = True
+
+    try:
+        for workers in args.workers:
+            print(f"\nStarting API with {workers} worker(s)...")
+            server = subprocess.Popen(
+                [
+                    sys.executable, "-m", "uvicorn", "main:app",
+                    "--host", "127.0.0.1",
+                    "--port", str(args.port),
+                    "--workers", str(workers),
+                    "--log-level", "warning"
+                ],
+                env=env
+            )
+
+            try:
+                if not wait_for_server(base_url):
+                    print("✗ API did not become ready")
+                    all_consistent = False
+                    continue
+
+                # The first worker to answer does not mean the others have loaded yet;
+                # reads that only reach one worker would hide diverging state.
+                time.sleep(args.settle)
+
+                # Warm up every worker before timing.
+                run_load(base_url, args.endpoints, workers * 20, args.concurrency)
+
+                consistent = check_consistency(
+                    base_url,
+                    args.consistency_uploads,
+                    args.consistency_reads,
+                    args.concurrency
+                )
+                all_consistent = all_consistent and consistent
+
+                ok, failed, elapsed = run_load(base_url, args.endpoints, args.requests, args.concurrency)
+                rate = ok / elapsed if elapsed else 0.0
+                rows.append((workers, ok, failed, elapsed, rate, consistent))
+                print(f"✓ {ok} ok, {failed} failed in {elapsed:.2f}s ({rate:.1f} req/s)")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        service.terminate()
+        service.wait()
+
+    if rows:
+        print("\n" + "="*50)
+        print(f"CPU cores: {os.cpu_count()}")
+        print(f"{'workers':>8} {'ok':>8} {'failed':>8} {'seconds':>9} {'req/s':>9} {'speedup':>8} {'consistent':>11}")
+        baseline = rows[0][4] or 1.0
+        for workers, ok, failed, elapsed, rate, consistent in rows:
+            print(
+                f"{workers:>8} {ok:>8} {failed:>8} {elapsed:>9.2f} {rate:>9.1f} "
+                f"{rate / baseline:>7.2f}x {'yes' if consistent else 'NO':>11}"
+            )
+
+    if not all_consistent:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
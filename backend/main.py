@@ -1,9 +1,10 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 import json
+import asyncio
 from datetime import datetime
 from typing import List, Dict, Optional
 from pydantic import BaseModel
@@ -14,7 +15,9 @@ load_dotenv()
 from services.keyframe_extractor import KeyframeExtractor
 from services.embedding_engine import EmbeddingEngine
 from services.clustering_engine import ClusteringEngine
+from services.clustering_service import ClusteringClient
 from services.storage_service import StorageService
+from services.keyframe_server import KeyframeServer
 
 app = FastAPI(title="Film Asset Management API")
 
@@ -28,14 +31,23 @@ app.add_middleware(
 
 keyframe_extractor = KeyframeExtractor()
 embedding_engine = EmbeddingEngine()
-clustering_engine = ClusteringEngine()
+
+# With several uvicorn workers every process must share one clustering state,
+# so point them all at the clustering service instead of a local engine.
+clustering_service_address = os.getenv("CLUSTERING_SERVICE_ADDRESS")
+if clustering_service_address:
+    clustering_engine = ClusteringClient(clustering_service_address)
+else:
+    clustering_engine = ClusteringEngine()
+
 storage_service = StorageService()
 
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("keyframes", exist_ok=True)
 os.makedirs("training_data", exist_ok=True)
 
-app.mount("/keyframes", StaticFiles(directory="keyframes"), name="keyframes")
+keyframe_server = KeyframeServer(root="keyframes")
+
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 class FeedbackRequest(BaseModel):
@@ -51,6 +63,11 @@ class MoveToClusterRequest(BaseModel):
 async def root():
     return {"message": "Film Asset Management API is running"}
 
+# Plain def: hashing and range reads are blocking file I/O, so this runs in the threadpool.
+@app.api_route("/keyframes/{file_path:path}", methods=["GET", "HEAD"])
+def get_keyframe(file_path: str, request: Request):
+    return keyframe_server.serve(file_path, request)
+
 @app.post("/api/upload")
 async def upload_video(file: UploadFile = File(...)):
     try:
@@ -72,10 +89,15 @@ async def upload_video(file: UploadFile = File(...)):
             scene_vector = embedding_engine.generate_scene_embedding(keyframe_path)
             character_vectors = embedding_engine.generate_character_embeddings(keyframe_path)
 
-            cluster_result = clustering_engine.assign_to_cluster(
+            # With the clustering service this is a blocking RPC that can wait on
+            # other workers, so keep it off the event loop. The local engine
+            # takes its own lock, so concurrent uploads are still applied in turn.
+            cluster_result = await asyncio.to_thread(
+                clustering_engine.assign_to_cluster,
                 scene_vector=scene_vector,
                 character_vectors=character_vectors,
-                keyframe_path=keyframe_path
+                keyframe_path=keyframe_path,
+                thumbnails=keyframe_data.get("thumbnails")
             )
 
             shot_info = {
@@ -1,16 +1,14 @@
 import chromadb
-from chromadb.config import Settings
+import json
 import numpy as np
+import threading
 from typing import List, Dict, Optional
 import uuid
 from datetime import datetime
 
 class ClusteringEngine:
     def __init__(self, scene_threshold: float = 0.85, character_threshold: float = 0.75, noise_threshold: float = 0.5):
-        self.client = chromadb.Client(Settings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory="./chroma_db"
-        ))
+        self.client = chromadb.PersistentClient(path="./chroma_db")
 
         try:
             self.scene_collection = self.client.get_collection("scene_clusters")
@@ -28,12 +26,25 @@ class ClusteringEngine:
                 metadata={"hnsw:space": "cosine"}
             )
 
+        # Noise shots are kept here as well as in memory, so a restart does not lose them.
+        try:
+            self.noise_collection = self.client.get_collection("noise_bucket")
+        except:
+            self.noise_collection = self.client.create_collection(
+                name="noise_bucket",
+                metadata={"hnsw:space": "cosine"}
+            )
+
         self.scene_threshold = scene_threshold
         self.character_threshold = character_threshold
         self.noise_threshold = noise_threshold
 
         self.clusters = {}
-        self.noise_bucket = []
+        self.noise_bucket = self._load_noise_bucket()
+
+        # Uploads call in from worker threads; cluster decisions and the noise
+        # bucket must change one batch at a time.
+        self.lock = threading.Lock()
 
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         vec1_np = np.array(vec1)
@@ -48,121 +59,213 @@ class ClusteringEngine:
 
         return dot_product / (norm1 * norm2)
 
+    def _thumbnail_metadata(self, thumbnails: Optional[Dict[str, str]]) -> Dict:
+        # Chroma metadata only holds scalar values, so the thumbnail map is flattened.
+        return {f"thumbnail_{size}": path for size, path in (thumbnails or {}).items()}
+
+    def _thumbnails_from_metadata(self, metadata: Dict) -> Dict[str, str]:
+        return {
+            key[len("thumbnail_"):]: value
+            for key, value in metadata.items()
+            if key.startswith("thumbnail_")
+        }
+
+    def _thumbnail_path(self, keyframe_path: str, thumbnails: Dict[str, str]) -> str:
+        return thumbnails.get("medium") or thumbnails.get("small") or keyframe_path
+
     def assign_to_cluster(
         self,
         scene_vector: List[float],
         character_vectors: List[List[float]],
-        keyframe_path: str
+        keyframe_path: str,
+        thumbnails: Optional[Dict[str, str]] = None
     ) -> Dict:
-        shot_id = str(uuid.uuid4())
+        return self.assign_to_clusters([{
+            "scene_vector": scene_vector,
+            "character_vectors": character_vectors,
+            "keyframe_path": keyframe_path,
+            "thumbnails": thumbnails
+        }])[0]
+
+    def _load_noise_bucket(self) -> List[Dict]:
+        all_data = self.noise_collection.get(include=["embeddings", "metadatas"])
+
+        noise_bucket = []
+        for shot_id, embedding, metadata in zip(all_data['ids'], all_data['embeddings'], all_data['metadatas']):
+            noise_bucket.append({
+                "shot_id": shot_id,
+                "keyframe_path": metadata.get('keyframe_path'),
+                "thumbnails": self._thumbnails_from_metadata(metadata),
+                "scene_vector": [float(value) for value in embedding],
+                "character_vectors": json.loads(metadata.get('character_vectors', "[]")),
+                "timestamp": metadata.get('timestamp')
+            })
 
-        try:
-            scene_results = self.scene_collection.query(
-                query_embeddings=[scene_vector],
-                n_results=1
-            )
+        return sorted(noise_bucket, key=lambda item: item['timestamp'] or "")
 
-            if scene_results['ids'] and len(scene_results['ids'][0]) > 0:
-                best_distance = scene_results['distances'][0][0]
-                similarity = 1 - best_distance
-
-                if similarity >= self.scene_threshold:
-                    cluster_id = scene_results['ids'][0][0]
-
-                    self.scene_collection.add(
-                        embeddings=[scene_vector],
-                        ids=[shot_id],
-                        metadatas=[{
-                            "keyframe_path": keyframe_path,
-                            "cluster_id": cluster_id,
-                            "similarity": float(similarity),
-                            "timestamp": datetime.now().isoformat()
-                        }]
-                    )
-
-                    if character_vectors:
-                        self._assign_character_cluster(
-                            shot_id,
-                            character_vectors,
-                            cluster_id,
-                            keyframe_path
-                        )
-
-                    return {
-                        "cluster_type": "scene",
-                        "cluster_id": cluster_id,
-                        "similarity_score": float(similarity),
-                        "shot_id": shot_id
-                    }
-
-                elif similarity < self.noise_threshold:
-                    self.noise_bucket.append({
-                        "shot_id": shot_id,
-                        "keyframe_path": keyframe_path,
-                        "scene_vector": scene_vector,
-                        "character_vectors": character_vectors,
-                        "timestamp": datetime.now().isoformat()
-                    })
-
-                    return {
-                        "cluster_type": "noise",
-                        "cluster_id": "noise_bucket",
-                        "similarity_score": float(similarity),
-                        "shot_id": shot_id
-                    }
-
-            new_cluster_id = f"scene_{str(uuid.uuid4())[:8]}"
-
-            self.scene_collection.add(
-                embeddings=[scene_vector],
-                ids=[shot_id],
-                metadatas=[{
-                    "keyframe_path": keyframe_path,
-                    "cluster_id": new_cluster_id,
-                    "similarity": 1.0,
-                    "timestamp": datetime.now().isoformat()
-                }]
-            )
+    def _noise_item(self, shot_id: str, shot: Dict) -> Dict:
+        return {
+            "shot_id": shot_id,
+            "keyframe_path": shot["keyframe_path"],
+            "thumbnails": shot.get("thumbnails") or {},
+            "scene_vector": shot["scene_vector"],
+            "character_vectors": shot.get("character_vectors") or [],
+            "timestamp": datetime.now().isoformat()
+        }
 
-            if character_vectors:
-                self._assign_character_cluster(
-                    shot_id,
-                    character_vectors,
-                    new_cluster_id,
-                    keyframe_path
-                )
+    def _noise_result(self, shot_id: str, similarity: float) -> Dict:
+        return {
+            "cluster_type": "noise",
+            "cluster_id": "noise_bucket",
+            "similarity_score": float(similarity),
+            "shot_id": shot_id
+        }
 
-            return {
-                "cluster_type": "scene",
-                "cluster_id": new_cluster_id,
-                "similarity_score": 1.0,
-                "shot_id": shot_id
-            }
+    def _store_noise_items(self, noise_items: List[Dict]):
+        if not noise_items:
+            return
+
+        self.noise_collection.upsert(
+            embeddings=[item["scene_vector"] for item in noise_items],
+            ids=[item["shot_id"] for item in noise_items],
+            metadatas=[
+                {
+                    "keyframe_path": item["keyframe_path"],
+                    # Chroma metadata only holds scalars, so the character vectors go in as JSON.
+                    "character_vectors": json.dumps(item["character_vectors"]),
+                    "timestamp": item["timestamp"],
+                    **self._thumbnail_metadata(item["thumbnails"])
+                }
+                for item in noise_items
+            ]
+        )
+
+        # A replayed batch reuses its shot ids, so replace rather than duplicate.
+        shot_ids = {item["shot_id"] for item in noise_items}
+        self.noise_bucket[:] = [item for item in self.noise_bucket if item['shot_id'] not in shot_ids]
+        self.noise_bucket.extend(noise_items)
+
+    def assign_to_clusters(self, shots: List[Dict]) -> List[Dict]:
+        if not shots:
+            return []
+
+        with self.lock:
+            return self._assign_batch(shots)
+
+    def _assign_batch(self, shots: List[Dict]) -> List[Dict]:
+        # Callers may pass stable shot ids so that replaying a batch overwrites it.
+        shot_ids = [shot.get("shot_id") or str(uuid.uuid4()) for shot in shots]
 
+        try:
+            if self.scene_collection.count() > 0:
+                scene_results = self.scene_collection.query(
+                    query_embeddings=[shot["scene_vector"] for shot in shots],
+                    n_results=1,
+                    include=["metadatas", "distances"]
+                )
+            else:
+                scene_results = {"ids": [[] for _ in shots]}
         except Exception as e:
             print(f"Error in clustering: {e}")
-
-            self.noise_bucket.append({
-                "shot_id": shot_id,
-                "keyframe_path": keyframe_path,
-                "scene_vector": scene_vector,
-                "character_vectors": character_vectors,
-                "timestamp": datetime.now().isoformat()
+            self._store_noise_items([self._noise_item(shot_id, shot) for shot_id, shot in zip(shot_ids, shots)])
+            return [self._noise_result(shot_id, 0.0) for shot_id in shot_ids]
+
+        results = []
+        batch_shots = []
+        noise_items = []
+
+        scene_ids, scene_embeddings, scene_metadatas = [], [], []
+        char_ids, char_embeddings, char_metadatas = [], [], []
+
+        for idx, shot in enumerate(shots):
+            shot_id = shot_ids[idx]
+            scene_vector = shot["scene_vector"]
+            thumbnails = shot.get("thumbnails") or {}
+
+            best_similarity = None
+            best_cluster_id = None
+
+            if len(scene_results['ids'][idx]) > 0:
+                best_similarity = 1 - scene_results['distances'][idx][0]
+                best_cluster_id = scene_results['metadatas'][idx][0].get('cluster_id')
+
+            # Shots added earlier in this batch are not in the index yet.
+            for cluster_id, batch_vector in batch_shots:
+                similarity = self.cosine_similarity(scene_vector, batch_vector)
+                if best_similarity is None or similarity > best_similarity:
+                    best_similarity = similarity
+                    best_cluster_id = cluster_id
+
+            if best_similarity is not None and best_similarity < self.noise_threshold:
+                noise_items.append(self._noise_item(shot_id, shot))
+                results.append(self._noise_result(shot_id, best_similarity))
+                continue
+
+            if best_similarity is not None and best_similarity >= self.scene_threshold:
+                cluster_id = best_cluster_id
+                similarity = float(best_similarity)
+            else:
+                cluster_id = f"scene_{str(uuid.uuid4())[:8]}"
+                similarity = 1.0
+
+            batch_shots.append((cluster_id, scene_vector))
+
+            scene_ids.append(shot_id)
+            scene_embeddings.append(scene_vector)
+            scene_metadatas.append({
+                "keyframe_path": shot["keyframe_path"],
+                "cluster_id": cluster_id,
+                "similarity": similarity,
+                "timestamp": datetime.now().isoformat(),
+                **self._thumbnail_metadata(thumbnails)
             })
 
-            return {
-                "cluster_type": "noise",
-                "cluster_id": "noise_bucket",
-                "similarity_score": 0.0,
+            for char_idx, char_vector in enumerate(shot.get("character_vectors") or []):
+                char_ids.append(f"{shot_id}_char_{char_idx}")
+                char_embeddings.append(char_vector)
+                char_metadatas.append({
+                    "shot_id": shot_id,
+                    "scene_cluster_id": cluster_id,
+                    "keyframe_path": shot["keyframe_path"],
+                    "character_index": char_idx,
+                    "timestamp": datetime.now().isoformat(),
+                    **self._thumbnail_metadata(thumbnails)
+                })
+
+            results.append({
+                "cluster_type": "scene",
+                "cluster_id": cluster_id,
+                "similarity_score": similarity,
                 "shot_id": shot_id
-            }
+            })
+
+        # Noise shots are only recorded once the cluster writes have gone through,
+        # so a failed batch leaves the noise bucket as it was.
+        if scene_ids:
+            self.scene_collection.upsert(
+                embeddings=scene_embeddings,
+                ids=scene_ids,
+                metadatas=scene_metadatas
+            )
+
+        if char_ids:
+            self.character_collection.upsert(
+                embeddings=char_embeddings,
+                ids=char_ids,
+                metadatas=char_metadatas
+            )
+
+        self._store_noise_items(noise_items)
+
+        return results
 
     def _assign_character_cluster(
         self,
         shot_id: str,
         character_vectors: List[List[float]],
         scene_cluster_id: str,
-        keyframe_path: str
+        keyframe_path: str,
+        thumbnails: Optional[Dict[str, str]] = None
     ):
         for char_idx, char_vector in enumerate(character_vectors):
             char_id = f"{shot_id}_char_{char_idx}"
@@ -175,7 +278,8 @@ class ClusteringEngine:
                     "scene_cluster_id": scene_cluster_id,
                     "keyframe_path": keyframe_path,
                     "character_index": char_idx,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now().isoformat(),
+                    **self._thumbnail_metadata(thumbnails)
                 }]
             )
 
@@ -196,9 +300,13 @@ class ClusteringEngine:
                     "shots": []
                 }
 
+            thumbnails = self._thumbnails_from_metadata(metadata)
+
             clusters[cluster_id]["shots"].append({
                 "id": all_data['ids'][idx],
                 "keyframe_path": metadata.get('keyframe_path'),
+                "thumbnail_path": self._thumbnail_path(metadata.get('keyframe_path'), thumbnails),
+                "thumbnails": thumbnails,
                 "similarity": metadata.get('similarity'),
                 "timestamp": metadata.get('timestamp')
             })
@@ -206,13 +314,24 @@ class ClusteringEngine:
         return clusters
 
     async def get_noise_bucket(self) -> List[Dict]:
-        return self.noise_bucket
+        with self.lock:
+            return [
+                {
+                    **item,
+                    "thumbnail_path": self._thumbnail_path(item['keyframe_path'], item.get('thumbnails', {}))
+                }
+                for item in self.noise_bucket
+            ]
 
     async def move_shot_to_cluster(self, shot_id: str, target_cluster_id: str) -> Dict:
+        with self.lock:
+            return self._move_shot(shot_id, target_cluster_id)
+
+    def _move_shot(self, shot_id: str, target_cluster_id: str) -> Dict:
         noise_item = None
-        for idx, item in enumerate(self.noise_bucket):
+        for item in self.noise_bucket:
             if item['shot_id'] == shot_id:
-                noise_item = self.noise_bucket.pop(idx)
+                noise_item = item
                 break
 
         if not noise_item:
@@ -226,7 +345,8 @@ class ClusteringEngine:
                 "cluster_id": target_cluster_id,
                 "similarity": 1.0,
                 "timestamp": datetime.now().isoformat(),
-                "moved_from_noise": True
+                "moved_from_noise": True,
+                **self._thumbnail_metadata(noise_item.get('thumbnails'))
             }]
         )
 
@@ -235,9 +355,14 @@ class ClusteringEngine:
                 shot_id,
                 noise_item['character_vectors'],
                 target_cluster_id,
-                noise_item['keyframe_path']
+                noise_item['keyframe_path'],
+                noise_item.get('thumbnails')
             )
 
+        # Only leave the bucket once the shot is stored in its cluster.
+        self.noise_collection.delete(ids=[shot_id])
+        self.noise_bucket.remove(noise_item)
+
         return {
             "success": True,
             "shot_id": shot_id,
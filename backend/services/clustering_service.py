@@ -0,0 +1,221 @@
+import asyncio
+import ipaddress
+import os
+import sys
+import threading
+import time
+from multiprocessing.managers import BaseManager, RemoteError
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_ADDRESS = "127.0.0.1:8001"
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def require_authkey() -> bytes:
+    # The manager unpickles whatever it receives, so the authkey is the only thing
+    # standing between the port and code execution. There is deliberately no default.
+    authkey = os.getenv("CLUSTERING_SERVICE_AUTHKEY")
+    if not authkey:
+        print("Error: CLUSTERING_SERVICE_AUTHKEY must be set to a shared secret for the clustering service")
+        sys.exit(1)
+    return authkey.encode()
+
+def is_private_host(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    # 0.0.0.0 counts as "private" to ipaddress but listens on every interface.
+    return not address.is_unspecified and (address.is_loopback or address.is_private)
+
+class ClusteringManager(BaseManager):
+    pass
+
+ClusteringManager.register("clustering")
+
+# Owns the single ClusteringEngine shared by every API worker. The manager
+# server handles each connection on its own thread, so all calls take one lock.
+# The version is bumped on every write so clients can reuse cached views.
+class ClusteringService:
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self._version = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def assign_to_cluster(
+        self,
+        scene_vector: List[float],
+        character_vectors: List[List[float]],
+        keyframe_path: str,
+        thumbnails: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        with self.lock:
+            try:
+                return self.engine.assign_to_cluster(
+                    scene_vector=scene_vector,
+                    character_vectors=character_vectors,
+                    keyframe_path=keyframe_path,
+                    thumbnails=thumbnails
+                )
+            finally:
+                # A failed write may still have reached Chroma, so cached views are dropped either way.
+                self._version += 1
+
+    def assign_to_clusters(self, shots: List[Dict]) -> List[Dict]:
+        with self.lock:
+            try:
+                return self.engine.assign_to_clusters(shots)
+            finally:
+                self._version += 1
+
+    def get_all_clusters(self, view_type: str = "scene") -> Tuple[int, Dict]:
+        with self.lock:
+            return self._version, asyncio.run(self.engine.get_all_clusters(view_type=view_type))
+
+    def get_noise_bucket(self) -> Tuple[int, List[Dict]]:
+        with self.lock:
+            return self._version, asyncio.run(self.engine.get_noise_bucket())
+
+    def move_shot_to_cluster(self, shot_id: str, target_cluster_id: str) -> Dict:
+        with self.lock:
+            try:
+                return asyncio.run(self.engine.move_shot_to_cluster(shot_id, target_cluster_id))
+            finally:
+                self._version += 1
+
+# Same interface as ClusteringEngine, backed by the clustering service process.
+class ClusteringClient:
+    def __init__(self, address: str, authkey: Optional[bytes] = None, connect_retries: int = 10):
+        self.address = parse_address(address)
+        self.authkey = authkey or require_authkey()
+        self.connect_retries = connect_retries
+
+        self.lock = threading.Lock()
+        self.generation = 0
+        self._cache: Dict[str, Tuple[int, object]] = {}
+
+        self._connect()
+
+    def _connect(self):
+        manager = ClusteringManager(address=self.address, authkey=self.authkey)
+
+        # Workers may come up before the service has finished loading Chroma.
+        for attempt in range(self.connect_retries):
+            try:
+                manager.connect()
+                break
+            except ConnectionRefusedError:
+                if attempt == self.connect_retries - 1:
+                    raise
+                time.sleep(1)
+
+        self.manager = manager
+        self.service = manager.clustering()
+
+        # A restarted service counts versions from zero again.
+        self._cache = {}
+        self.generation += 1
+
+    def _reconnect(self, generation: int):
+        with self.lock:
+            if self.generation == generation:
+                print(f"Lost connection to the clustering service, reconnecting to {self.address}")
+                self._connect()
+
+    def _call(self, method: str, *args, retry: bool = True):
+        generation = self.generation
+        try:
+            return getattr(self.service, method)(*args)
+        except RemoteError:
+            # A thread without a cached connection reaches a restarted service
+            # directly, which rejects the old proxy before running anything.
+            self._reconnect(generation)
+            return getattr(self.service, method)(*args)
+        except (ConnectionError, EOFError):
+            # The service went away (e.g. restarted): reconnect once and retry.
+            # Proxies share one cached connection per thread and address, so this
+            # thread's dead connection must be dropped even when another thread
+            # has already reconnected.
+            self.service._tls.__dict__.pop("connection", None)
+            self._reconnect(generation)
+
+            # The service may have applied a write before the connection dropped,
+            # so only calls that are safe to repeat are retried.
+            if not retry:
+                raise
+            return getattr(self.service, method)(*args)
+
+    def assign_to_cluster(
+        self,
+        scene_vector: List[float],
+        character_vectors: List[List[float]],
+        keyframe_path: str,
+        thumbnails: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        return self._call("assign_to_cluster", scene_vector, character_vectors, keyframe_path, thumbnails, retry=False)
+
+    def assign_to_clusters(self, shots: List[Dict]) -> List[Dict]:
+        # With caller-supplied shot ids a repeated batch upserts the same rows.
+        retry = all(shot.get("shot_id") for shot in shots)
+        return self._call("assign_to_clusters", shots, retry=retry)
+
+    def _cached(self, key: str, method: str, *args):
+        version = self._call("version")
+
+        cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        version, data = self._call(method, *args)
+        self._cache[key] = (version, data)
+        return data
+
+    async def get_all_clusters(self, view_type: str = "scene") -> Dict:
+        return await asyncio.to_thread(self._cached, f"clusters:{view_type}", "get_all_clusters", view_type)
+
+    async def get_noise_bucket(self) -> List[Dict]:
+        return await asyncio.to_thread(self._cached, "noise_bucket", "get_noise_bucket")
+
+    async def move_shot_to_cluster(self, shot_id: str, target_cluster_id: str) -> Dict:
+        return await asyncio.to_thread(self._call, "move_shot_to_cluster", shot_id, target_cluster_id, retry=False)
+
+def serve(address: str, authkey: bytes, engine=None):
+    host, port = parse_address(address)
+    if not is_private_host(host):
+        print(f"Error: refusing to bind the clustering service to {host}; use a loopback or private address")
+        sys.exit(1)
+
+    if engine is None:
+        from services.clustering_engine import ClusteringEngine
+        engine = ClusteringEngine()
+
+    service = ClusteringService(engine)
+
+    # Registering on a subclass keeps the client-side registration untouched.
+    class ServiceManager(ClusteringManager):
+        pass
+
+    ServiceManager.register("clustering", callable=lambda: service)
+
+    manager = ServiceManager(address=(host, port), authkey=authkey)
+    server = manager.get_server()
+
+    print(f"Clustering service listening on {address}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    serve(
+        address=os.getenv("CLUSTERING_SERVICE_ADDRESS", DEFAULT_ADDRESS),
+        authkey=require_authkey()
+    )
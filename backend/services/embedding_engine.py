@@ -22,30 +22,70 @@ class EmbeddingEngine:
             print(f"Error generating scene embedding: {e}")
             return [0.0] * 512
 
-    def generate_character_embeddings(self, image_path: str) -> List[List[float]]:
+    def _encode_batch(self, images: List[Image.Image], batch_size: int) -> List[Optional[List[float]]]:
         try:
-            image = cv2.imread(image_path)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            encoded = self.scene_model.encode(images, batch_size=batch_size, convert_to_numpy=True)
+            return [embedding.tolist() for embedding in encoded]
+        except Exception as e:
+            print(f"Error encoding batch, retrying images one at a time: {e}")
 
-            faces = self.face_detector.detect_faces(image_rgb)
+        # One bad image must not take the rest of the batch down with it.
+        embeddings = []
+        for image in images:
+            try:
+                embeddings.append(self.scene_model.encode(image, convert_to_numpy=True).tolist())
+            except Exception as e:
+                print(f"Error encoding image: {e}")
+                embeddings.append(None)
+        return embeddings
 
-            if not faces:
-                return []
+    def generate_scene_embeddings(self, image_paths: List[str], batch_size: int = 32) -> List[List[float]]:
+        embeddings = [[0.0] * 512 for _ in image_paths]
 
-            character_embeddings = []
+        images = []
+        owners = []
+        for idx, image_path in enumerate(image_paths):
+            try:
+                images.append(Image.open(image_path).convert('RGB'))
+                owners.append(idx)
+            except Exception as e:
+                print(f"Error generating scene embedding: {e}")
+
+        if images:
+            for idx, embedding in zip(owners, self._encode_batch(images, batch_size)):
+                if embedding is not None:
+                    embeddings[idx] = embedding
+
+        return embeddings
+
+    def _detect_face_crops(self, image_path: str) -> List[Image.Image]:
+        image = cv2.imread(image_path)
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        faces = self.face_detector.detect_faces(image_rgb)
+
+        face_crops = []
+
+        for face in faces:
+            x, y, w, h = face['box']
+
+            x = max(0, x)
+            y = max(0, y)
 
-            for face in faces:
-                x, y, w, h = face['box']
+            face_crop = image_rgb[y:y+h, x:x+w]
 
-                x = max(0, x)
-                y = max(0, y)
+            if face_crop.size == 0:
+                continue
 
-                face_crop = image_rgb[y:y+h, x:x+w]
+            face_crops.append(Image.fromarray(face_crop))
 
-                if face_crop.size == 0:
-                    continue
+        return face_crops
 
-                face_pil = Image.fromarray(face_crop)
+    def generate_character_embeddings(self, image_path: str) -> List[List[float]]:
+        try:
+            character_embeddings = []
+
+            for face_pil in self._detect_face_crops(image_path):
                 face_embedding = self.scene_model.encode(face_pil, convert_to_numpy=True)
 
                 character_embeddings.append(face_embedding.tolist())
@@ -55,3 +95,26 @@ class EmbeddingEngine:
         except Exception as e:
             print(f"Error generating character embeddings: {e}")
             return []
+
+    def generate_character_embeddings_batch(self, image_paths: List[str], batch_size: int = 32) -> List[List[List[float]]]:
+        character_embeddings = [[] for _ in image_paths]
+
+        # Face detection runs per image, but every crop is encoded in one batch.
+        face_crops = []
+        owners = []
+        for idx, image_path in enumerate(image_paths):
+            try:
+                crops = self._detect_face_crops(image_path)
+            except Exception as e:
+                print(f"Error generating character embeddings: {e}")
+                continue
+
+            face_crops.extend(crops)
+            owners.extend([idx] * len(crops))
+
+        if face_crops:
+            for idx, embedding in zip(owners, self._encode_batch(face_crops, batch_size)):
+                if embedding is not None:
+                    character_embeddings[idx].append(embedding)
+
+        return character_embeddings
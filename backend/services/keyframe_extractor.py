@@ -1,12 +1,35 @@
 import cv2
+import hashlib
 import numpy as np
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+THUMBNAIL_WIDTHS = {
+    "small": 320,
+    "medium": 640
+}
 
 class KeyframeExtractor:
-    def __init__(self, static_threshold: float = 10.0, dynamic_frames: int = 3):
+    def __init__(
+        self,
+        static_threshold: float = 10.0,
+        dynamic_frames: int = 3,
+        output_dir: str = "keyframes",
+        thumbnail_widths: Dict[str, int] = None,
+        thumbnail_quality: int = 80
+    ):
         self.static_threshold = static_threshold
         self.dynamic_frames = dynamic_frames
+        self.output_dir = output_dir
+        self.thumbnail_dir = f"{output_dir}/thumbs"
+        self.thumbnail_widths = thumbnail_widths or THUMBNAIL_WIDTHS
+        self.thumbnail_quality = thumbnail_quality
+
+        # OpenCV builds without libwebp cannot encode WebP; JPEG is always available.
+        if cv2.haveImageWriter(".webp"):
+            self.thumbnail_format = (".webp", [cv2.IMWRITE_WEBP_QUALITY, thumbnail_quality])
+        else:
+            self.thumbnail_format = (".jpg", [cv2.IMWRITE_JPEG_QUALITY, thumbnail_quality])
 
     def calculate_frame_variance(self, frame1: np.ndarray, frame2: np.ndarray) -> float:
         gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
@@ -17,7 +40,62 @@ class KeyframeExtractor:
 
         return variance
 
-    def extract_keyframes(self, video_path: str) -> List[Dict]:
+    def _write_image(self, image: np.ndarray, base_path: str, extension: str, params: List[int]) -> str:
+        ok, buffer = cv2.imencode(extension, image, params)
+        if not ok:
+            raise ValueError(f"Cannot encode image as {extension}: {base_path}")
+
+        data = buffer.tobytes()
+
+        # The content hash in the name makes every URL immutable, so it can be cached for good.
+        image_path = f"{base_path}_{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+        with open(image_path, "wb") as f:
+            f.write(data)
+
+        return image_path
+
+    def generate_thumbnails(self, frame: np.ndarray, name: str) -> Dict[str, str]:
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+
+        height, width = frame.shape[:2]
+        thumbnails = {}
+
+        # Largest first, so each smaller size is resized from the previous one
+        # instead of from the full-resolution frame.
+        source = frame
+        for size, target_width in sorted(self.thumbnail_widths.items(), key=lambda item: -item[1]):
+            if target_width < source.shape[1]:
+                target_height = max(1, round(height * target_width / width))
+                source = cv2.resize(source, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+            extension, params = self.thumbnail_format
+            thumbnails[size] = self._write_image(source, f"{self.thumbnail_dir}/{name}_{size}", extension, params)
+
+        return thumbnails
+
+    def save_keyframe(self, frame: np.ndarray, name: str) -> Dict:
+        keyframe_path = self._write_image(frame, f"{self.output_dir}/{name}", ".jpg", [])
+
+        return {
+            "path": keyframe_path,
+            "thumbnails": self.generate_thumbnails(frame, name)
+        }
+
+    def _read_frame(self, video_path: str, frame_index: int) -> np.ndarray:
+        # Decode up to the frame rather than seeking, which is not frame-accurate for every codec.
+        cap = cv2.VideoCapture(video_path)
+
+        frame = None
+        for _ in range(frame_index + 1):
+            ret, frame = cap.read()
+            if not ret:
+                cap.release()
+                raise ValueError(f"Cannot read frame {frame_index}: {video_path}")
+
+        cap.release()
+        return frame
+
+    def extract_keyframes(self, video_path: str, name: Optional[str] = None) -> List[Dict]:
         cap = cv2.VideoCapture(video_path)
 
         if not cap.isOpened():
@@ -30,59 +108,70 @@ class KeyframeExtractor:
             cap.release()
             raise ValueError("Video has no frames")
 
-        frames = []
-        variances = []
+        # Only the candidate keyframes (first, middle, last) are kept, so memory
+        # stays at a few frames however long the video is.
+        expected_middle_idx = total_frames // 2
 
-        ret, prev_frame = cap.read()
+        ret, first_frame = cap.read()
         if not ret:
             cap.release()
             raise ValueError("Cannot read first frame")
 
-        frames.append(prev_frame)
+        middle_frame = first_frame
+        prev_frame = first_frame
+        frame_count = 1
+        variance_sum = 0.0
 
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
 
-            if len(frames) > 0:
-                variance = self.calculate_frame_variance(prev_frame, frame)
-                variances.append(variance)
+            variance_sum += self.calculate_frame_variance(prev_frame, frame)
 
-            frames.append(frame)
+            if frame_count == expected_middle_idx:
+                middle_frame = frame
+
+            frame_count += 1
             prev_frame = frame
 
         cap.release()
 
-        avg_variance = np.mean(variances) if variances else 0
+        last_frame = prev_frame
+        avg_variance = variance_sum / (frame_count - 1) if frame_count > 1 else 0
+
+        # The container's frame count is only an estimate; if it was off, go back
+        # for the real middle frame.
+        middle_idx = frame_count // 2
+        if middle_idx != expected_middle_idx:
+            middle_frame = self._read_frame(video_path, middle_idx)
 
         keyframes = []
-        base_filename = os.path.splitext(os.path.basename(video_path))[0]
+        base_filename = name or os.path.splitext(os.path.basename(video_path))[0]
 
         if avg_variance < self.static_threshold:
-            median_idx = len(frames) // 2
-            keyframe_path = f"keyframes/{base_filename}_frame_{median_idx}.jpg"
-            cv2.imwrite(keyframe_path, frames[median_idx])
+            saved = self.save_keyframe(middle_frame, f"{base_filename}_frame_{middle_idx}")
 
             keyframes.append({
-                "path": keyframe_path,
-                "frame_index": median_idx,
+                "path": saved["path"],
+                "thumbnails": saved["thumbnails"],
+                "frame_index": middle_idx,
                 "type": "static"
             })
 
         else:
-            indices = [
-                0,
-                len(frames) // 2,
-                len(frames) - 1
+            candidates = [
+                (0, first_frame),
+                (middle_idx, middle_frame),
+                (frame_count - 1, last_frame)
             ]
 
-            for idx in indices:
-                keyframe_path = f"keyframes/{base_filename}_frame_{idx}.jpg"
-                cv2.imwrite(keyframe_path, frames[idx])
+            for idx, frame in candidates:
+                saved = self.save_keyframe(frame, f"{base_filename}_frame_{idx}")
 
                 keyframes.append({
-                    "path": keyframe_path,
+                    "path": saved["path"],
+                    "thumbnails": saved["thumbnails"],
                     "frame_index": idx,
                     "type": "dynamic"
                 })
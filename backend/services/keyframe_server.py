@@ -0,0 +1,127 @@
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+mimetypes.add_type("image/webp", ".webp")
+
+# Written by KeyframeExtractor as "<name>_<12 hex digits of sha256>.<ext>".
+CONTENT_ADDRESSED_NAME = re.compile(r"_[0-9a-f]{12}\.[A-Za-z0-9]+$")
+
+class KeyframeServer:
+    def __init__(self, root: str = "keyframes", max_age: int = 31536000):
+        self.root = os.path.realpath(root)
+        self.max_age = max_age
+
+        self._etags: Dict[str, Tuple[int, int, str]] = {}
+
+    def resolve(self, relative_path: str) -> Optional[str]:
+        file_path = os.path.realpath(os.path.join(self.root, relative_path))
+
+        if os.path.commonpath([self.root, file_path]) != self.root:
+            return None
+
+        if not os.path.isfile(file_path):
+            return None
+
+        return file_path
+
+    def compute_etag(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+
+        cached = self._etags.get(file_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+
+        etag = f'"{digest.hexdigest()[:32]}"'
+        self._etags[file_path] = (stat.st_mtime_ns, stat.st_size, etag)
+
+        return etag
+
+    def parse_range(self, range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+        unit, _, ranges = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in ranges:
+            raise ValueError("Unsupported range")
+
+        start_text, _, end_text = ranges.strip().partition("-")
+
+        # Nothing in an empty file can satisfy a range, including a suffix range.
+        if file_size == 0:
+            return None
+
+        if start_text == "":
+            suffix_length = int(end_text)
+            if suffix_length <= 0:
+                return None
+            return max(0, file_size - suffix_length), file_size - 1
+
+        start = int(start_text)
+        end = int(end_text) if end_text else file_size - 1
+
+        if start >= file_size or end < start:
+            return None
+
+        return start, min(end, file_size - 1)
+
+    def serve(self, relative_path: str, request: Request) -> Response:
+        file_path = self.resolve(relative_path)
+        if not file_path:
+            return Response(status_code=404)
+
+        etag = self.compute_etag(file_path)
+        file_size = os.path.getsize(file_path)
+        media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+        # Only content-addressed names can never change under the same URL; anything
+        # else (e.g. keyframes written before hashing) must be revalidated by ETag.
+        if CONTENT_ADDRESSED_NAME.search(os.path.basename(file_path)):
+            cache_control = f"public, max-age={self.max_age}, immutable"
+        else:
+            cache_control = "no-cache"
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Accept-Ranges": "bytes"
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # If-None-Match uses weak comparison, so W/"x" matches our strong "x".
+            candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            if "*" in candidates or etag in candidates:
+                return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+
+        # A stale If-Range means the client's partial copy is outdated, so it gets the whole file.
+        if range_header and (not if_range or if_range.strip() == etag):
+            try:
+                byte_range = self.parse_range(range_header, file_size)
+            except ValueError:
+                # Malformed or multi-part ranges are ignored and answered with the full file.
+                return FileResponse(file_path, headers=headers, media_type=media_type)
+
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{file_size}"
+                return Response(status_code=416, headers=headers)
+
+            start, end = byte_range
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                content = f.read(end - start + 1)
+
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            return Response(content=content, status_code=206, headers=headers, media_type=media_type)
+
+        return FileResponse(file_path, headers=headers, media_type=media_type)
@@ -29,6 +29,21 @@ class StorageService:
             print(f"Error saving shot to Supabase: {e}")
             return {"success": False, "error": str(e)}
 
+    async def save_shots(self, shots: List[Dict]) -> Dict:
+        if not self.supabase:
+            return {"success": False, "message": "Supabase not configured"}
+
+        if not shots:
+            return {"success": True, "data": []}
+
+        # Upsert on the primary key, so replaying a batch with the same ids is a no-op.
+        try:
+            result = self.supabase.table("shots").upsert(shots).execute()
+            return {"success": True, "data": result.data}
+        except Exception as e:
+            print(f"Error saving shots to Supabase: {e}")
+            return {"success": False, "error": str(e)}
+
     async def save_feedback(self, feedback_data: Dict) -> Dict:
         if not self.supabase:
             return {"success": False, "message": "Supabase not configured"}
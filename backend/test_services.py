@@ -0,0 +1,449 @@
+import os
+import sys
+import tempfile
+
+# Checks for the service logic that does not need the ML models.
+# Run from the backend directory: python3 test_services.py
+
+failures = 0
+
+def check(description: str, condition: bool):
+    global failures
+    if condition:
+        print(f"✓ {description}")
+    else:
+        failures += 1
+        print(f"✗ {description}")
+
+print("Testing keyframe extraction...")
+
+import cv2
+import numpy as np
+from services.keyframe_extractor import KeyframeExtractor
+
+with tempfile.TemporaryDirectory() as output_dir:
+    extractor = KeyframeExtractor(output_dir=output_dir)
+    frame = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    saved = extractor.save_keyframe(frame, "clip_frame_0")
+    extension = extractor.thumbnail_format[0]
+
+    check("Keyframe written as content-addressed JPEG", os.path.isfile(saved["path"]) and saved["path"].endswith(".jpg"))
+    check("Small and medium thumbnails written", sorted(saved["thumbnails"]) == ["medium", "small"])
+    check(
+        f"Thumbnails use {extension}",
+        all(path.endswith(extension) and os.path.isfile(path) for path in saved["thumbnails"].values())
+    )
+    check("Medium thumbnail is 640px wide", cv2.imread(saved["thumbnails"]["medium"]).shape[1] == 640)
+    check("Small thumbnail is 320px wide", cv2.imread(saved["thumbnails"]["small"]).shape[1] == 320)
+
+    changed = extractor.save_keyframe(255 - frame, "clip_frame_0")
+    check("Different content under the same name gets a new path", changed["path"] != saved["path"])
+
+    # Simulate an OpenCV build without libwebp.
+    have_image_writer = cv2.haveImageWriter
+    cv2.haveImageWriter = lambda extension: extension != ".webp"
+    try:
+        fallback = KeyframeExtractor(output_dir=output_dir).save_keyframe(frame, "clip_frame_1")
+    finally:
+        cv2.haveImageWriter = have_image_writer
+
+    check(
+        "Thumbnails fall back to JPEG without WebP support",
+        all(path.endswith(".jpg") and os.path.isfile(path) for path in fallback["thumbnails"].values())
+    )
+
+def write_video(path: str, frames):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+with tempfile.TemporaryDirectory() as output_dir:
+    extractor = KeyframeExtractor(output_dir=output_dir)
+
+    dynamic_path = os.path.join(output_dir, "dynamic.mp4")
+    write_video(dynamic_path, [np.full((48, 64, 3), value * 20, dtype=np.uint8) for value in range(11)])
+
+    keyframes = extractor.extract_keyframes(dynamic_path)
+    check("Dynamic video keeps first, middle and last frame", [item["frame_index"] for item in keyframes] == [0, 5, 10])
+    check(
+        "Middle keyframe is the middle frame",
+        abs(cv2.imread(keyframes[1]["path"]).mean() - 100) < 5
+    )
+    check("Frames can be read back by index", abs(extractor._read_frame(dynamic_path, 7).mean() - 140) < 5)
+
+    static_path = os.path.join(output_dir, "static.mp4")
+    write_video(static_path, [np.full((48, 64, 3), 128, dtype=np.uint8)] * 9)
+
+    keyframes = extractor.extract_keyframes(static_path)
+    check("Static video keeps only the median frame", [item["frame_index"] for item in keyframes] == [4])
+
+print("\n" + "="*50)
+print("Testing keyframe server...")
+
+from starlette.requests import Request
+from services.keyframe_server import KeyframeServer
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+    })
+
+server = KeyframeServer()
+
+check("parse_range bytes=0-99", server.parse_range("bytes=0-99", 1000) == (0, 99))
+check("parse_range open end", server.parse_range("bytes=900-", 1000) == (900, 999))
+check("parse_range suffix", server.parse_range("bytes=-100", 1000) == (900, 999))
+check("parse_range end clamped to file size", server.parse_range("bytes=990-2000", 1000) == (990, 999))
+check("parse_range start past end is unsatisfiable", server.parse_range("bytes=1000-", 1000) is None)
+check("parse_range reversed range is unsatisfiable", server.parse_range("bytes=50-10", 1000) is None)
+check("parse_range suffix on an empty file is unsatisfiable", server.parse_range("bytes=-100", 0) is None)
+check("parse_range on an empty file is unsatisfiable", server.parse_range("bytes=0-", 0) is None)
+
+for header in ["items=0-10", "bytes=0-10,20-30", "bytes=abc-"]:
+    try:
+        server.parse_range(header, 1000)
+        check(f"parse_range rejects {header}", False)
+    except ValueError:
+        check(f"parse_range rejects {header}", True)
+
+with tempfile.TemporaryDirectory() as root:
+    server = KeyframeServer(root=root)
+    content = bytes(range(256)) * 4
+
+    hashed_name = "clip_frame_0_0123456789ab.jpg"
+    for name in [hashed_name, "legacy_frame_0.jpg"]:
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(content)
+
+    response = server.serve(hashed_name, make_request({}))
+    etag = response.headers["etag"]
+    check("Full response is 200", response.status_code == 200)
+    check("Strong ETag is quoted and not weak", etag.startswith('"') and not etag.startswith("W/"))
+    check("Content-addressed file is cached as immutable", "immutable" in response.headers["cache-control"])
+    check(
+        "Legacy file name must be revalidated",
+        server.serve("legacy_frame_0.jpg", make_request({})).headers["cache-control"] == "no-cache"
+    )
+
+    check("Matching If-None-Match returns 304", server.serve(hashed_name, make_request({"If-None-Match": etag})).status_code == 304)
+    check(
+        "If-None-Match list containing the ETag returns 304",
+        server.serve(hashed_name, make_request({"If-None-Match": f'"other", {etag}'})).status_code == 304
+    )
+    check(
+        "Weak If-None-Match returns 304",
+        server.serve(hashed_name, make_request({"If-None-Match": f"W/{etag}"})).status_code == 304
+    )
+    check("If-None-Match * returns 304", server.serve(hashed_name, make_request({"If-None-Match": "*"})).status_code == 304)
+    check(
+        "Stale If-None-Match returns 200",
+        server.serve(hashed_name, make_request({"If-None-Match": '"stale"'})).status_code == 200
+    )
+
+    response = server.serve(hashed_name, make_request({"Range": "bytes=10-19"}))
+    check("Range request returns 206", response.status_code == 206)
+    check("Range body matches file slice", response.body == content[10:20])
+    check("Content-Range header", response.headers["content-range"] == f"bytes 10-19/{len(content)}")
+
+    response = server.serve(hashed_name, make_request({"Range": f"bytes={len(content)}-"}))
+    check("Unsatisfiable range returns 416", response.status_code == 416)
+
+    response = server.serve(hashed_name, make_request({"Range": "bytes=10-19", "If-Range": '"stale"'}))
+    check("Stale If-Range returns the full file", response.status_code == 200)
+
+    with open(os.path.join(root, "empty_0123456789ab.jpg"), "wb"):
+        pass
+    response = server.serve("empty_0123456789ab.jpg", make_request({"Range": "bytes=-100"}))
+    check("Suffix range on an empty file returns 416", response.status_code == 416)
+    check("Empty file Content-Range", response.headers["content-range"] == "bytes */0")
+
+    check("Path traversal returns 404", server.serve("../etc/passwd", make_request({})).status_code == 404)
+    check("Missing file returns 404", server.serve("missing.jpg", make_request({})).status_code == 404)
+
+print("\n" + "="*50)
+print("Testing clustering service...")
+
+import asyncio
+import multiprocessing
+from services import clustering_service
+from services.clustering_service import ClusteringClient, is_private_host, require_authkey
+
+class StubClusteringEngine:
+    def __init__(self):
+        self.shots = []
+
+    def assign_to_cluster(self, scene_vector, character_vectors, keyframe_path, thumbnails=None):
+        self.shots.append(keyframe_path)
+        return {"cluster_type": "scene", "cluster_id": "scene_stub", "similarity_score": 1.0, "shot_id": keyframe_path}
+
+    def assign_to_clusters(self, shots):
+        return [
+            self.assign_to_cluster(shot["scene_vector"], shot["character_vectors"], shot["keyframe_path"])
+            for shot in shots
+        ]
+
+    async def get_all_clusters(self, view_type="scene"):
+        return {"scene_stub": {"cluster_id": "scene_stub", "shots": list(self.shots)}}
+
+    async def get_noise_bucket(self):
+        return []
+
+    async def move_shot_to_cluster(self, shot_id, target_cluster_id):
+        raise ValueError(f"Shot {shot_id} not found in noise bucket")
+
+def run_stub_service(address: str, authkey: bytes):
+    clustering_service.serve(address, authkey, engine=StubClusteringEngine())
+
+def start_stub_service(address: str, authkey: bytes) -> multiprocessing.Process:
+    process = multiprocessing.get_context("fork").Process(target=run_stub_service, args=(address, authkey), daemon=True)
+    process.start()
+    return process
+
+check("Loopback address is allowed", is_private_host("127.0.0.1"))
+check("Private address is allowed", is_private_host("10.0.0.5"))
+check("Unspecified address is refused", not is_private_host("0.0.0.0"))
+check("Public address is refused", not is_private_host("8.8.8.8"))
+
+saved_authkey = os.environ.pop("CLUSTERING_SERVICE_AUTHKEY", None)
+try:
+    require_authkey()
+    check("Missing CLUSTERING_SERVICE_AUTHKEY exits", False)
+except SystemExit:
+    check("Missing CLUSTERING_SERVICE_AUTHKEY exits", True)
+finally:
+    if saved_authkey is not None:
+        os.environ["CLUSTERING_SERVICE_AUTHKEY"] = saved_authkey
+
+address = "127.0.0.1:8765"
+authkey = os.urandom(32)
+service_process = start_stub_service(address, authkey)
+
+try:
+    client = ClusteringClient(address, authkey=authkey)
+
+    client.assign_to_cluster([1.0], [], "a.jpg")
+    clusters = asyncio.run(client.get_all_clusters())
+    check("Assignment is visible through the service", clusters["scene_stub"]["shots"] == ["a.jpg"])
+
+    second_client = ClusteringClient(address, authkey=authkey)
+    second_client.assign_to_cluster([1.0], [], "b.jpg")
+    clusters = asyncio.run(client.get_all_clusters())
+    check("Cached view is refreshed after another client writes", clusters["scene_stub"]["shots"] == ["a.jpg", "b.jpg"])
+
+    try:
+        asyncio.run(client.move_shot_to_cluster("missing", "scene_stub"))
+        check("Service errors reach the client as ValueError", False)
+    except ValueError:
+        check("Service errors reach the client as ValueError", True)
+
+    service_process.terminate()
+    service_process.join()
+    service_process = start_stub_service(address, authkey)
+
+    # The write may have reached the old service, so it is not repeated.
+    try:
+        client.assign_to_cluster([1.0], [], "lost.jpg")
+        check("Write without a shot id is not retried after a restart", False)
+    except (ConnectionError, EOFError):
+        check("Write without a shot id is not retried after a restart", True)
+
+    client.assign_to_cluster([1.0], [], "c.jpg")
+    clusters = asyncio.run(client.get_all_clusters())
+    check("Client reconnects after the service restarts", clusters["scene_stub"]["shots"] == ["c.jpg"])
+
+    service_process.terminate()
+    service_process.join()
+    service_process = start_stub_service(address, authkey)
+
+    client.assign_to_clusters([{"shot_id": "d_0", "scene_vector": [1.0], "character_vectors": [], "keyframe_path": "d.jpg"}])
+    clusters = asyncio.run(client.get_all_clusters())
+    check("Batch with shot ids is retried after a restart", clusters["scene_stub"]["shots"] == ["d.jpg"])
+
+    service_process.terminate()
+    service_process.join()
+    service_process = start_stub_service(address, authkey)
+
+    clusters = asyncio.run(client.get_all_clusters())
+    check("Reads are retried after a restart", clusters["scene_stub"]["shots"] == [])
+finally:
+    service_process.terminate()
+    service_process.join()
+
+print("\n" + "="*50)
+print("Testing batch clustering...")
+
+import math
+import threading
+from services.clustering_engine import ClusteringEngine
+
+class StubCollection:
+    def __init__(self):
+        self.rows = {}
+
+    def count(self):
+        return len(self.rows)
+
+    def query(self, query_embeddings, n_results, include):
+        engine = ClusteringEngine.__new__(ClusteringEngine)
+        results = {"ids": [], "distances": [], "metadatas": []}
+
+        for query in query_embeddings:
+            best_id = max(self.rows, key=lambda row_id: engine.cosine_similarity(query, self.rows[row_id][0]))
+            embedding, metadata = self.rows[best_id]
+            results["ids"].append([best_id])
+            results["distances"].append([1 - engine.cosine_similarity(query, embedding)])
+            results["metadatas"].append([metadata])
+
+        return results
+
+    def upsert(self, embeddings, ids, metadatas):
+        for row_id, embedding, metadata in zip(ids, embeddings, metadatas):
+            self.rows[row_id] = (embedding, metadata)
+
+    add = upsert
+
+    def get(self, include=None):
+        return {
+            "ids": list(self.rows),
+            "embeddings": [embedding for embedding, _ in self.rows.values()],
+            "metadatas": [metadata for _, metadata in self.rows.values()]
+        }
+
+    def delete(self, ids):
+        for row_id in ids:
+            self.rows.pop(row_id, None)
+
+def make_engine() -> ClusteringEngine:
+    engine = ClusteringEngine.__new__(ClusteringEngine)
+    engine.scene_collection = StubCollection()
+    engine.character_collection = StubCollection()
+    engine.noise_collection = StubCollection()
+    engine.scene_threshold = 0.85
+    engine.character_threshold = 0.75
+    engine.noise_threshold = 0.5
+    engine.clusters = {}
+    engine.noise_bucket = []
+    engine.lock = threading.Lock()
+    return engine
+
+def at_angle(degrees: float):
+    return [math.cos(math.radians(degrees)), math.sin(math.radians(degrees))]
+
+def shot(degrees: float, name: str, **extra):
+    return {"scene_vector": at_angle(degrees), "character_vectors": [], "keyframe_path": name, **extra}
+
+# b is within the scene threshold of a and c of b, but c is not close enough to a.
+chain = [shot(0, "a.jpg"), shot(25, "b.jpg"), shot(50, "c.jpg")]
+
+engine = make_engine()
+batched = engine.assign_to_clusters(chain)
+check("First shot of an empty index opens a cluster", batched[0]["cluster_type"] == "scene")
+check(
+    "Shots joined earlier in the batch are compared against",
+    batched[0]["cluster_id"] == batched[1]["cluster_id"] == batched[2]["cluster_id"]
+)
+
+engine = make_engine()
+single = [engine.assign_to_cluster(**item) for item in chain]
+check("Single-shot path reports the cluster id, not the nearest shot id", single[1]["cluster_id"] == single[0]["cluster_id"])
+check(
+    "Batching does not change assignments",
+    len({result["cluster_id"] for result in single}) == len({result["cluster_id"] for result in batched}) == 1
+)
+
+result = engine.assign_to_cluster(**shot(180, "opposite.jpg"))
+check("Dissimilar shot goes to the noise bucket", result["cluster_type"] == "noise" and len(engine.noise_bucket) == 1)
+
+engine = make_engine()
+replay = [shot(0, "a.jpg", shot_id="hash_0"), shot(180, "z.jpg", shot_id="hash_1")]
+first = engine.assign_to_clusters(replay)
+second = engine.assign_to_clusters(replay)
+check("Caller-supplied shot ids are kept", [item["shot_id"] for item in first] == ["hash_0", "hash_1"])
+check("Replaying a batch does not duplicate scene rows", engine.scene_collection.count() == 1)
+check("Replaying a batch does not duplicate noise entries", len(engine.noise_bucket) == 1)
+check("Replayed shot stays in its own cluster", second[0]["cluster_id"] == first[0]["cluster_id"])
+
+engine = make_engine()
+engine.assign_to_cluster(**shot(0, "anchor.jpg"))
+engine.assign_to_clusters([shot(180, "noise.jpg", shot_id="noise_0", character_vectors=[[0.5, 0.5]], thumbnails={"small": "noise_small.jpg"})])
+
+restarted = make_engine()
+restarted.noise_collection = engine.noise_collection
+restarted.noise_bucket = restarted._load_noise_bucket()
+check("Noise bucket is reloaded after a restart", [item["shot_id"] for item in restarted.noise_bucket] == ["noise_0"])
+check(
+    "Reloaded noise shot keeps its vectors and thumbnails",
+    restarted.noise_bucket[0]["character_vectors"] == [[0.5, 0.5]]
+    and restarted.noise_bucket[0]["thumbnails"] == {"small": "noise_small.jpg"}
+)
+
+asyncio.run(restarted.move_shot_to_cluster("noise_0", "scene_target"))
+check("Moved shot leaves the persisted noise bucket", restarted.noise_collection.count() == 0 and not restarted.noise_bucket)
+
+class FailingCollection(StubCollection):
+    def upsert(self, embeddings, ids, metadatas):
+        raise RuntimeError("Chroma is unavailable")
+
+engine = make_engine()
+engine.assign_to_cluster(**shot(0, "anchor.jpg"))
+engine.character_collection = FailingCollection()
+try:
+    engine.assign_to_clusters([shot(180, "noise.jpg"), shot(0, "scene.jpg", character_vectors=[[1.0, 0.0]])])
+    check("Failed cluster write raises", False)
+except RuntimeError:
+    check("Failed cluster write raises", True)
+check("Failed batch leaves the noise bucket untouched", not engine.noise_bucket and engine.noise_collection.count() == 0)
+
+class FailingEngine:
+    def assign_to_clusters(self, shots):
+        raise RuntimeError("Chroma is unavailable")
+
+service = clustering_service.ClusteringService(FailingEngine())
+try:
+    service.assign_to_clusters([])
+except RuntimeError:
+    pass
+check("Failed write still invalidates cached views", service.version() == 1)
+
+engine = make_engine()
+engine.assign_to_cluster(**shot(0, "anchor.jpg"))
+threads = [
+    threading.Thread(target=engine.assign_to_cluster, kwargs=shot(180, f"noise_{idx}.jpg"))
+    for idx in range(16)
+]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+check("Concurrent uploads keep every noise shot", len(engine.noise_bucket) == 16 and engine.noise_collection.count() == 16)
+
+print("\n" + "="*50)
+print("Testing bulk ingest...")
+
+from ingest import load_checkpoint, shot_id_for
+
+with tempfile.TemporaryDirectory() as directory:
+    checkpoint_path = os.path.join(directory, "ingest_checkpoint.jsonl")
+    with open(checkpoint_path, "w") as f:
+        f.write('{"hash": "aaa", "path": "a.mp4", "shots": 1}\n')
+        f.write("\n")
+        f.write('{"hash": "bbb", "path": "b.mp4", "shots": 3}\n')
+        f.write('{"hash": "ccc", "pa')
+
+    check("Checkpoint with a truncated last line loads the complete entries", load_checkpoint(checkpoint_path) == {"aaa", "bbb"})
+    check("Missing checkpoint loads as empty", load_checkpoint(os.path.join(directory, "missing.jsonl")) == set())
+
+check("Shot ids are stable for the same file and frame", shot_id_for("ab" * 32, 7) == shot_id_for("ab" * 32, 7))
+check("Shot ids differ per frame", shot_id_for("ab" * 32, 7) != shot_id_for("ab" * 32, 8))
+
+print("\n" + "="*50)
+if failures:
+    print(f"✗ {failures} check(s) failed")
+    sys.exit(1)
+
+print("✓ All checks passed")
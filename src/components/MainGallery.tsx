@@ -94,7 +94,8 @@ function ClusterFolder({ cluster, expanded, onToggle }: ClusterFolderProps) {
               <div key={shot.id} className="group relative">
                 <div className="aspect-video rounded-lg overflow-hidden bg-zinc-800">
                   <img
-                    src={`http://localhost:8000/${shot.keyframe_path}`}
+                    src={`http://localhost:8000/${shot.thumbnail_path ?? shot.keyframe_path}`}
+                    loading="lazy"
                     alt={shot.id}
                     className="w-full h-full object-cover"
                   />
@@ -75,7 +75,8 @@ function DraggableShot({ shot }: DraggableShotProps) {
       <div className="bg-zinc-800 rounded-lg overflow-hidden transition-all hover:ring-2 hover:ring-amber-500">
         <div className="aspect-video">
           <img
-            src={`http://localhost:8000/${shot.keyframe_path}`}
+            src={`http://localhost:8000/${shot.thumbnail_path ?? shot.keyframe_path}`}
+            loading="lazy"
             alt={shot.shot_id}
             className="w-full h-full object-cover"
           />
@@ -1,6 +1,8 @@
 export interface Shot {
   id: string;
   keyframe_path: string;
+  thumbnail_path?: string;
+  thumbnails?: Record<string, string>;
   similarity?: number;
   timestamp: string;
 }
@@ -13,6 +15,8 @@ export interface Cluster {
 export interface NoiseShot {
   shot_id: string;
   keyframe_path: string;
+  thumbnail_path?: string;
+  thumbnails?: Record<string, string>;
   scene_vector: number[];
   character_vectors: number[][];
   timestamp: string;